@@ -8,24 +8,35 @@ Example:
   python3 openclaw_skill/littleai/scripts/boot_greet.py --ip DEVICE_IP
 
 Notes:
-- Uses macOS `say` to generate a short TTS clip (PCM16@16k) and streams it over WS.
+- Uses macOS `say` to render each greeting (PCM16@16k) once, then streams the cached WAV over WS.
 - Picks a greeting phrase randomly so it varies a bit.
+- Cache: ~/.openclaw/state/greetings/<hash>.wav (`--prewarm` renders all of them and exits).
 """
 
 import argparse
 import asyncio
-import base64
+import hashlib
 import os
 import random
+import struct
 import subprocess
-import tempfile
-import wave
-import array
 
 import websockets
 
-SAMPLE_RATE = 16000
-CHUNK_SAMPLES = 800  # 50ms @ 16kHz
+from wsaudio import (
+    CHUNK_SAMPLES,
+    MOUTH_ZERO,
+    RIG_CLEAR,
+    AckWindow,
+    aio_run,
+    check_fmt,
+    mouth_frame,
+    pcm_frames,
+    sanitize_text,
+    ws_send,
+)
+
+GREETING_CACHE = os.path.expanduser("~/.openclaw/state/greetings")
 
 GREETINGS = [
     "Howdy!",
@@ -38,41 +49,42 @@ GREETINGS = [
 ]
 
 
-def sanitize_text(s: str) -> str:
-    # Keep captions/inputs ASCII-ish so LVGL doesn't show missing-glyph squares.
-    return (
-        s.replace("’", "'")
-        .replace("‘", "'")
-        .replace("“", '"')
-        .replace("”", '"')
-        .replace("…", "...")
-        .replace("—", "-")
-        .replace("–", "-")
-        .replace("\u00A0", " ")
-    )
-
-
-def gen_wav_say(text: str, out_wav: str) -> None:
-    cmd = ["say", "-o", out_wav, "--data-format=LEI16@16000", sanitize_text(text)]
-    subprocess.check_call(cmd)
-
-
-def rms_open(frames: bytes, prev: float) -> float:
-    a = array.array("h")
-    a.frombytes(frames)
-    if not a:
-        return prev
-    acc = 0
-    for s in a:
-        acc += s * s
-    rms = (acc / len(a)) ** 0.5
-    target = min(1.0, max(0.0, rms / 7000.0))
-    return prev * 0.70 + target * 0.30
-
-
-async def ws_send(ws, obj):
-    await ws.send(__import__("json").dumps(obj))
-    return await ws.recv()
+def greeting_wav(greeting: str) -> str:
+    """Return the cached WAV for `greeting`, rendering it with `say` on first use."""
+    h = hashlib.sha1(greeting.encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(GREETING_CACHE, f"{h}.wav")
+    if not os.path.exists(path):
+        os.makedirs(GREETING_CACHE, exist_ok=True)
+        tmp = path + ".tmp.wav"
+        subprocess.check_call(["say", "-o", tmp, "--data-format=LEI16@16000", sanitize_text(greeting)])
+        os.replace(tmp, path)
+    return path
+
+
+def read_wav_header(f) -> int:
+    """Validate a WAV header, leave `f` at the start of the PCM data and return its size."""
+    riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+    assert riff == b"RIFF" and wave_id == b"WAVE", (riff, wave_id)
+    while True:
+        chunk_id, size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"data":
+            return size
+        # CoreAudio may add padding chunks (e.g. FLLR) before `data`.
+        body = f.read(size + (size & 1))
+        if chunk_id == b"fmt ":
+            check_fmt(body)
+
+
+async def wav_chunks(wav_path: str):
+    # Raw reads after a one-time header check; no per-chunk `wave` bookkeeping.
+    with open(wav_path, "rb") as f:
+        remaining = read_wav_header(f)
+        while remaining > 0:
+            frames = f.read(min(CHUNK_SAMPLES * 2, remaining))
+            if not frames:
+                break
+            remaining -= len(frames)
+            yield frames
 
 
 async def yawn(ws):
@@ -85,57 +97,46 @@ async def yawn(ws):
     await asyncio.sleep(0.15)
 
     # Start yawn: open mouth.
-    await ws_send(ws, {"type": "mouth", "open": 0.10})
+    await ws_send(ws, mouth_frame(0.10))
     await ws_send(ws, {"type": "blink", "duration_ms": 450})
     await asyncio.sleep(0.20)
 
-    await ws_send(ws, {"type": "mouth", "open": 1.00})
+    await ws_send(ws, mouth_frame(1.00))
     await asyncio.sleep(0.55)
 
     # Close mouth smoothly.
     steps = 10
     for i in range(steps):
         v = 1.0 - ((i + 1) / steps) * 0.95
-        await ws_send(ws, {"type": "mouth", "open": float(f"{v:.3f}")})
+        await ws_send(ws, mouth_frame(v))
         await asyncio.sleep(0.06)
 
-    await ws_send(ws, {"type": "mouth", "open": 0.0})
-    await ws_send(ws, {"type": "rig_clear"})
+    await ws_send(ws, MOUTH_ZERO)
+    await ws_send(ws, RIG_CLEAR)
 
 
-async def stream_wav(ws, wav_path: str):
+async def stream_wav(ws, chunks):
     # Drive mouth openness from audio energy while streaming.
-    await ws_send(ws, {"type": "mouth", "open": 0.0})
+    await ws_send(ws, MOUTH_ZERO)
 
-    mouth_prev = 0.0
-    with wave.open(wav_path, "rb") as w:
-        assert w.getnchannels() == 1
-        assert w.getsampwidth() == 2
-        assert w.getframerate() == SAMPLE_RATE
-
-        while True:
-            frames = w.readframes(CHUNK_SAMPLES)
-            if not frames:
-                break
-
-            mouth_prev = rms_open(frames, mouth_prev)
-            await ws_send(ws, {"type": "mouth", "open": float(f"{mouth_prev:.3f}")})
-
-            b64 = base64.b64encode(frames).decode("ascii")
-            await ws.send('{"type":"speak_pcm","data_b64":"' + b64 + '"}')
-            rep = await ws.recv()
-            if '"ok":true' not in rep:
-                print(rep)
-
-    await ws_send(ws, {"type": "mouth", "open": 0.0})
-    await ws_send(ws, {"type": "rig_clear"})
+    try:
+        async with AckWindow(ws) as win:
+            async for frame in pcm_frames(chunks):
+                await win.send(frame)
+    finally:
+        # Release the mouth override even if `say` fails mid-stream.
+        await ws_send(ws, MOUTH_ZERO)
+        await ws_send(ws, RIG_CLEAR)
 
 
 async def run(ip: str):
     greeting = random.choice(GREETINGS)
 
+    # Usually a cache hit; on a miss `say` renders while we yawn.
+    wav_task = asyncio.create_task(asyncio.to_thread(greeting_wav, greeting))
+
     uri = f"ws://{ip}:8080/ws"
-    async with websockets.connect(uri, max_size=2**20) as ws:
+    async with websockets.connect(uri, max_size=2**20, compression=None, max_queue=None) as ws:
         # caption first, so you see something immediately
         await ws_send(ws, {"type": "caption", "text": sanitize_text(greeting), "ttl_ms": 8000})
 
@@ -147,28 +148,31 @@ async def run(ip: str):
         await ws_send(ws, {"type": "gaze", "x": random.choice([-0.15, 0.0, 0.18]), "y": -0.05})
 
         # speak
-        with tempfile.TemporaryDirectory() as td:
-            wav_path = os.path.join(td, "tts.wav")
-            gen_wav_say(greeting, wav_path)
-            await stream_wav(ws, wav_path)
+        await stream_wav(ws, wav_chunks(await wav_task))
 
         # settle
         await asyncio.sleep(0.2)
         await ws_send(ws, {"type": "set_expression", "expression": "neutral"})
         await ws_send(ws, {"type": "gaze", "x": 0.0, "y": 0.0})
-        await ws_send(ws, {"type": "rig_clear"})
+        await ws_send(ws, RIG_CLEAR)
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--ip", help="Device IP (or set LITTLEAI_IP env var)")
+    ap.add_argument("--prewarm", action="store_true", help="Render all greetings into the cache and exit")
     args = ap.parse_args()
 
+    if args.prewarm:
+        for greeting in GREETINGS:
+            print(f"{greeting_wav(greeting)}  {greeting}")
+        return
+
     ip = args.ip or os.environ.get("LITTLEAI_IP")
     if not ip:
         raise SystemExit("Missing --ip (or set LITTLEAI_IP).")
 
-    asyncio.run(run(ip))
+    aio_run(run(ip))
 
 
 if __name__ == "__main__":
@@ -14,6 +14,6 @@ fi
 
 source "$VENV/bin/activate"
 python -m pip install -U pip >/dev/null
-python -m pip install websockets==12.0
+python -m pip install websockets==12.0 numpy orjson uvloop
 
 echo "OK: venv ready at $VENV"
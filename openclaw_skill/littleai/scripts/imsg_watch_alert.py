@@ -2,9 +2,11 @@
 """Watch iMessage chats and alert via littleAI (NO outbound texting).
 
 This is meant to run as a long-lived background process on macOS.
-It polls `imsg` for new messages in specific chats and, when a message looks
-important, it triggers a littleAI attention animation (caption + blink + beep;
-optionally speaks for urgent messages).
+It follows a single `imsg watch` stream (falling back to polling `imsg history`)
+for new messages in specific chats and, when a message looks important, it
+triggers a littleAI attention animation (caption + blink + beep; optionally
+speaks for urgent messages). Alerts reuse one WebSocket connection for the
+lifetime of the watcher.
 
 IMPORTANT:
 - This script does NOT send iMessages.
@@ -22,16 +24,22 @@ Example:
 
 State:
 - lock:  ~/.openclaw/state/littleai-imsg-watch.lock
-- state: ~/.openclaw/state/littleai-imsg-watch-state.json
+- state: ~/.openclaw/state/littleai-imsg-watch-state.json (written at most every 30s, and on exit)
 Logs: redirect stdout/stderr when running in background.
 """
 
 import argparse
+import asyncio
+import atexit
+import concurrent.futures
 import json
 import os
+import queue
 import re
+import signal
 import subprocess
 import sys
+import threading
 import time
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
@@ -39,6 +47,21 @@ from typing import Dict, List, Optional, Tuple
 # Only needed for the lock
 import fcntl
 
+try:
+    import ahocorasick  # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
+try:
+    from orjson import loads as _json_loads  # parses bytes directly; errors subclass JSONDecodeError
+except ImportError:
+    _json_loads = json.loads
+
+import websockets
+from websockets.protocol import State
+
+import attention
+
 
 @dataclass
 class WatchTarget:
@@ -79,27 +102,58 @@ IMPORTANT_KEYWORDS = {
 
 TRIVIAL = {"k", "ok", "okay", "lol", "thanks", "thx", "👍", "👌"}
 
+_RE_NONDIGIT = re.compile(r"\D")
+_RE_TIME_HM = re.compile(r"\b\d{1,2}:\d{2}\b")
+_RE_TIME_AMPM = re.compile(r"\b\d{1,2}\s?(am|pm)\b")
+_RE_WS = re.compile(r"\s+")
+
+
+def _build_keyword_automaton():
+    a = ahocorasick.Automaton()
+    for k in URGENT_KEYWORDS:
+        a.add_word(k, "urgent")
+    for k in IMPORTANT_KEYWORDS:
+        a.add_word(k, "important")
+    a.make_automaton()
+    return a
+
 
-def sh(cmd: List[str], timeout_s: int = 10) -> str:
-    return subprocess.check_output(cmd, text=True, timeout=timeout_s)
+_KEYWORDS = _build_keyword_automaton() if ahocorasick is not None else None
+
+
+def keyword_classes(tl: str) -> set:
+    """Return which keyword classes ("urgent", "important") occur in lowercased text."""
+    if _KEYWORDS is not None:
+        # One pass over the text for all keywords.
+        return {label for _, label in _KEYWORDS.iter(tl)}
+    out = set()
+    if any(k in tl for k in URGENT_KEYWORDS):
+        out.add("urgent")
+    if any(k in tl for k in IMPORTANT_KEYWORDS):
+        out.add("important")
+    return out
+
+
+def sh(cmd: List[str], timeout_s: int = 10) -> bytes:
+    return subprocess.check_output(cmd, timeout=timeout_s)
 
 
 def norm_handle(h: str) -> str:
     # Keep + and digits only for comparisons
     h = h.strip()
     if h.startswith("+"):
-        return "+" + re.sub(r"\D", "", h)
-    return re.sub(r"\D", "", h)
+        return "+" + _RE_NONDIGIT.sub("", h)
+    return _RE_NONDIGIT.sub("", h)
 
 
-def parse_jsonl(s: str) -> List[dict]:
+def parse_jsonl(s: bytes) -> List[dict]:
     out = []
-    for line in s.splitlines():
+    for line in s.split(b"\n"):
         line = line.strip()
         if not line:
             continue
         try:
-            out.append(json.loads(line))
+            out.append(_json_loads(line))
         except json.JSONDecodeError:
             # tolerate weird output
             continue
@@ -137,6 +191,30 @@ def save_state(path: str, state: dict) -> None:
     os.replace(tmp, path)
 
 
+class DeferredSave:
+    """Batch save_state() calls: mark() on change, write at most every `interval_s`, and on flush()."""
+
+    def __init__(self, path: str, state: dict, interval_s: float = 30.0):
+        self.path = path
+        self.state = state
+        self.interval_s = interval_s
+        self.dirty = False
+        self._last = time.monotonic()
+
+    def mark(self) -> None:
+        self.dirty = True
+
+    def maybe_flush(self) -> None:
+        if self.dirty and time.monotonic() - self._last >= self.interval_s:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.dirty:
+            save_state(self.path, self.state)
+            self.dirty = False
+        self._last = time.monotonic()
+
+
 def looks_important(text: str) -> Tuple[bool, bool]:
     """Return (important, urgent)."""
     t = (text or "").strip()
@@ -148,16 +226,17 @@ def looks_important(text: str) -> Tuple[bool, bool]:
     if tl in TRIVIAL and len(tl) <= 5:
         return (False, False)
 
-    urgent = any(k in tl for k in URGENT_KEYWORDS)
+    hits = keyword_classes(tl)
+    urgent = "urgent" in hits
     important = urgent
 
     if "?" in t:
         important = True
 
-    if re.search(r"\b\d{1,2}:\d{2}\b", tl) or re.search(r"\b\d{1,2}\s?(am|pm)\b", tl):
+    if _RE_TIME_HM.search(tl) or _RE_TIME_AMPM.search(tl):
         important = True
 
-    if any(k in tl for k in IMPORTANT_KEYWORDS):
+    if "important" in hits:
         important = True
 
     if len(t) >= 25:
@@ -167,33 +246,63 @@ def looks_important(text: str) -> Tuple[bool, bool]:
 
 
 def truncate_one_line(s: str, n: int = 72) -> str:
-    s = re.sub(r"\s+", " ", (s or "").strip())
+    s = _RE_WS.sub(" ", (s or "").strip())
     if len(s) <= n:
         return s
     return s[: n - 1] + "…"
 
 
-def alert_littleai(littleai_ip: str, label: str, text: str, urgent: bool, speak_urgent: bool) -> None:
-    # Delegate to the existing attention script (handles caption + blink + optional beep/speak).
+class AttentionClient:
+    """Run attention sequences over one long-lived WebSocket.
+
+    The event loop lives in a daemon thread so the connection (and its keepalive
+    pings) stays serviced while the watcher blocks in its sync poll loop.
+    """
+
+    def __init__(self, ip: str):
+        self.ip = ip
+        self._ws = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="littleai-ws", daemon=True).start()
+
+    async def _alert(self, text: str, mode: str, speak: bool) -> None:
+        for attempt in range(2):
+            # `.state` works on both the legacy (<14) and new websockets clients; `.closed` doesn't.
+            if self._ws is None or self._ws.state is not State.OPEN:
+                self._ws = await websockets.connect(
+                    f"ws://{self.ip}:8080/ws", max_size=2**20, compression=None, max_queue=None
+                )
+            try:
+                await attention.run(self.ip, text, mode, beep=True, speak=speak, ws=self._ws)
+                return
+            except websockets.ConnectionClosed:
+                # Device rebooted or dropped the idle socket: reconnect once.
+                self._ws = None
+                if attempt:
+                    raise
+            except BaseException:
+                # Failed mid-sequence (e.g. `say` error, timeout): acks may still be
+                # unread, so don't reuse this socket for the next alert.
+                ws, self._ws = self._ws, None
+                await ws.close()
+                raise
+
+    def alert(self, text: str, mode: str, speak: bool, timeout_s: float = 60) -> None:
+        fut = asyncio.run_coroutine_threadsafe(self._alert(text, mode, speak), self._loop)
+        try:
+            fut.result(timeout=timeout_s)
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            raise
+
+
+def alert_littleai(client: AttentionClient, label: str, text: str, urgent: bool, speak_urgent: bool) -> None:
+    # Delegate to attention.run (handles caption + blink + optional beep/speak).
     mode = "urgent" if urgent else "normal"
 
     caption = f"{label}: {truncate_one_line(text)}"
 
-    cmd = [
-        sys.executable,
-        os.path.join(os.path.dirname(__file__), "attention.py"),
-        "--ip",
-        littleai_ip,
-        "--mode",
-        mode,
-        "--text",
-        caption,
-        "--beep",
-    ]
-    if urgent and speak_urgent:
-        cmd.append("--speak")
-
-    subprocess.run(cmd, check=False, timeout=60)
+    client.alert(caption, mode, speak=urgent and speak_urgent)
 
 
 def acquire_lock(lock_path: str):
@@ -216,6 +325,88 @@ def bootstrap_last_seen(chat_id: int) -> int:
     return int(mid) if isinstance(mid, int) or (isinstance(mid, str) and mid.isdigit()) else 0
 
 
+def start_imsg_watch() -> Optional[Tuple[subprocess.Popen, "queue.Queue[Optional[bytes]]"]]:
+    """Start one long-lived `imsg watch --json` and pump its JSONL lines into a queue.
+
+    A None item on the queue means the watcher exited (e.g. an `imsg` without `watch`).
+    """
+    try:
+        proc = subprocess.Popen(["imsg", "watch", "--json"], stdout=subprocess.PIPE)
+    except OSError:
+        return None
+    lines: "queue.Queue[Optional[bytes]]" = queue.Queue()
+
+    def pump():
+        for line in iter(proc.stdout.readline, b""):
+            lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=pump, name="imsg-watch", daemon=True).start()
+    return proc, lines
+
+
+def resolve_targets(
+    targets: List[WatchTarget], resolved: Dict[str, int], state: dict, saver: DeferredSave
+) -> List[WatchTarget]:
+    """Look up chat ids for unresolved targets; return the ones newly resolved."""
+    new = []
+    for t in targets:
+        key = norm_handle(t.handle)
+        if key in resolved:
+            continue
+        cid = find_chat_id_for_handle(t.handle)
+        if cid is None:
+            print(f"[imsg-watch] chat not found for {t.handle} ({t.label}); will retry")
+            continue
+        resolved[key] = cid
+        new.append(t)
+        # seed last_seen if missing
+        if key not in state["last_seen"]:
+            state["last_seen"][key] = bootstrap_last_seen(cid)
+            saver.mark()
+            print(f"[imsg-watch] seeded last_seen for {t.label} chat_id={cid} -> {state['last_seen'][key]}")
+    return new
+
+
+def handle_new_entries(
+    t: WatchTarget, entries: List[dict], state: dict, saver: DeferredSave, client: AttentionClient, speak_urgent: bool
+) -> None:
+    key = norm_handle(t.handle)
+    last_seen = int(state["last_seen"].get(key, 0) or 0)
+
+    new = [e for e in entries if int(e.get("id", 0) or 0) > last_seen]
+    if not new:
+        return
+
+    # Update last_seen to highest id we saw, regardless of from_me, so we don't reprocess.
+    max_id = max(int(e.get("id", 0) or 0) for e in new)
+    state["last_seen"][key] = max_id
+    saver.mark()
+
+    # Find newest inbound message among the new ones.
+    inbound = [e for e in new if not bool(e.get("is_from_me", False))]
+    if not inbound:
+        return
+
+    newest = max(inbound, key=lambda e: int(e.get("id", 0) or 0))
+    text = str(newest.get("text", "") or "")
+
+    important, urgent = looks_important(text)
+    if not important:
+        return
+
+    print(f"[imsg-watch] alert: {t.label} urgent={urgent} text={truncate_one_line(text, 120)}")
+    alert_littleai(client, t.label, text, urgent=urgent, speak_urgent=speak_urgent)
+
+
+def poll_history(
+    t: WatchTarget, cid: int, state: dict, saver: DeferredSave, client: AttentionClient, speak_urgent: bool
+) -> None:
+    # Fetch a few latest messages and look for new inbound messages.
+    entries = parse_jsonl(sh(["imsg", "history", "--chat-id", str(cid), "--limit", "10", "--json"], timeout_s=20))
+    handle_new_entries(t, entries, state, saver, client, speak_urgent)
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--littleai-ip", default=os.environ.get("LITTLEAI_IP"), help="littleAI device IP")
@@ -252,62 +443,65 @@ def main():
     if "last_seen" not in state:
         state["last_seen"] = {}
 
+    # Keep last_seen in memory; persist periodically and on exit (SIGTERM -> SystemExit -> atexit).
+    saver = DeferredSave(state_path, state)
+    atexit.register(saver.flush)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    client = AttentionClient(args.littleai_ip)
+
     # Resolve chat ids (retry later if missing)
     resolved: Dict[str, int] = {}
 
     print("[imsg-watch] starting")
     print(f"[imsg-watch] littleai_ip={args.littleai_ip} poll={args.poll_seconds}s")
 
+    poll_s = max(5, int(args.poll_seconds))
+    next_resolve = 0.0
+
+    watch = start_imsg_watch()
+    if watch is None:
+        print("[imsg-watch] `imsg watch` unavailable; polling history")
+    else:
+        # Runs on SIGTERM too (-> SystemExit), so the child isn't orphaned.
+        atexit.register(watch[0].terminate)
+
     while True:
         try:
-            for t in targets:
-                key = norm_handle(t.handle)
-
-                if key not in resolved:
-                    cid = find_chat_id_for_handle(t.handle)
-                    if cid is None:
-                        print(f"[imsg-watch] chat not found for {t.handle} ({t.label}); will retry")
-                        continue
-                    resolved[key] = cid
-                    # seed last_seen if missing
-                    if key not in state["last_seen"]:
-                        state["last_seen"][key] = bootstrap_last_seen(cid)
-                        save_state(state_path, state)
-                        print(f"[imsg-watch] seeded last_seen for {t.label} chat_id={cid} -> {state['last_seen'][key]}")
-
-                cid = resolved[key]
-                last_seen = int(state["last_seen"].get(key, 0) or 0)
-
-                # Fetch a few latest messages and look for new inbound messages.
-                entries = parse_jsonl(
-                    sh(["imsg", "history", "--chat-id", str(cid), "--limit", "10", "--json"], timeout_s=20)
-                )
-                # entries are newest-first
-                new = [e for e in entries if int(e.get("id", 0) or 0) > last_seen]
-                if not new:
+            saver.maybe_flush()
+            # `imsg chats` per unresolved target, so at most once per poll interval.
+            if time.monotonic() >= next_resolve:
+                next_resolve = time.monotonic() + poll_s
+                for t in resolve_targets(targets, resolved, state, saver):
+                    if watch is not None:
+                        # The watch stream only shows new messages; catch up on ones that
+                        # arrived while we weren't running.
+                        poll_history(t, resolved[norm_handle(t.handle)], state, saver, client, args.speak_urgent)
+
+            if watch is not None:
+                # One streaming `imsg watch` for all chats; time out periodically to retry unresolved targets.
+                try:
+                    line = watch[1].get(timeout=poll_s)
+                except queue.Empty:
                     continue
-
-                # Update last_seen to highest id we saw, regardless of from_me, so we don't reprocess.
-                max_id = max(int(e.get("id", 0) or 0) for e in new)
-                state["last_seen"][key] = max_id
-                save_state(state_path, state)
-
-                # Find newest inbound message among the new ones.
-                inbound = [e for e in new if not bool(e.get("is_from_me", False))]
-                if not inbound:
+                if line is None:
+                    print("[imsg-watch] `imsg watch` exited; falling back to polling history")
+                    watch = None
                     continue
+                by_chat = {resolved[norm_handle(t.handle)]: t for t in targets if norm_handle(t.handle) in resolved}
+                for e in parse_jsonl(line):
+                    t = by_chat.get(int(e.get("chat_id", 0) or 0))
+                    if t is not None:
+                        handle_new_entries(t, [e], state, saver, client, args.speak_urgent)
+                continue
 
-                newest = max(inbound, key=lambda e: int(e.get("id", 0) or 0))
-                text = str(newest.get("text", "") or "")
-
-                important, urgent = looks_important(text)
-                if not important:
+            for t in targets:
+                cid = resolved.get(norm_handle(t.handle))
+                if cid is None:
                     continue
+                poll_history(t, cid, state, saver, client, args.speak_urgent)
 
-                print(f"[imsg-watch] alert: {t.label} urgent={urgent} text={truncate_one_line(text, 120)}")
-                alert_littleai(args.littleai_ip, t.label, text, urgent=urgent, speak_urgent=args.speak_urgent)
-
-            time.sleep(max(5, int(args.poll_seconds)))
+            time.sleep(poll_s)
 
         except KeyboardInterrupt:
             print("[imsg-watch] stopping")
@@ -316,6 +510,5 @@ def main():
             print(f"[imsg-watch] error: {e}")
             time.sleep(5)
 
-
 if __name__ == "__main__":
     main()
@@ -96,6 +96,59 @@ static esp_err_t send_json(httpd_req_t *req, cJSON *obj) {
     return err;
 }
 
+// Binary frames carry audio without the base64/JSON round-trip:
+//   [u8 op][u8 reserved][u16 LE arg][payload...]
+// The 4-byte header keeps the PCM payload 16-bit aligned in the recv buffer.
+#define WS_BIN_HDR_LEN        4
+#define WS_BIN_OP_PCM         0x01  // payload: PCM16 LE mono samples
+#define WS_BIN_OP_PCM_MOUTH   0x02  // same, plus arg = mouth open 0..1000 (sticky override)
+#define WS_BIN_OP_MOUTH       0x03  // no payload; arg = mouth open 0..1000 (sticky override)
+
+static bool set_mouth_milli(uint16_t milli) {
+    if (!s_face || !s_face_mux || xSemaphoreTake(s_face_mux, pdMS_TO_TICKS(50)) != pdTRUE) {
+        return false;
+    }
+    s_face->mouth_open = clampf(milli / 1000.0f, 0.0f, 1.0f);
+    s_face->mouth_open_override = true;
+    xSemaphoreGive(s_face_mux);
+    return true;
+}
+
+static cJSON* handle_binary(const uint8_t *buf, size_t len) {
+    cJSON *resp = cJSON_CreateObject();
+    uint8_t op = len >= WS_BIN_HDR_LEN ? buf[0] : 0;
+    uint16_t arg = len >= WS_BIN_HDR_LEN ? (uint16_t)(buf[2] | (buf[3] << 8)) : 0;
+
+    if (op == WS_BIN_OP_PCM_MOUTH) {
+        // Apply the mouth before the (blocking) audio write so they stay in step.
+        set_mouth_milli(arg);
+    }
+
+    if (op == WS_BIN_OP_MOUTH) {
+        bool ok = set_mouth_milli(arg);
+        cJSON_AddBoolToObject(resp, "ok", ok);
+        if (!ok) cJSON_AddStringToObject(resp, "error", "face_unavailable");
+        cJSON_AddStringToObject(resp, "type", "ack");
+        cJSON_AddStringToObject(resp, "cmd", "mouth");
+    } else if (op == WS_BIN_OP_PCM || op == WS_BIN_OP_PCM_MOUTH) {
+        size_t pcm_len = (len - WS_BIN_HDR_LEN) & ~((size_t)1);
+        if (pcm_len < 2) {
+            cJSON_AddBoolToObject(resp, "ok", false);
+            cJSON_AddStringToObject(resp, "error", "short_pcm");
+        } else {
+            esp_err_t ae = audio_play_pcm16_mono((const int16_t *)(buf + WS_BIN_HDR_LEN), pcm_len / 2);
+            cJSON_AddBoolToObject(resp, "ok", ae == ESP_OK);
+            if (ae != ESP_OK) cJSON_AddStringToObject(resp, "error", esp_err_to_name(ae));
+        }
+        cJSON_AddStringToObject(resp, "type", "ack");
+        cJSON_AddStringToObject(resp, "cmd", "speak_pcm");
+    } else {
+        cJSON_AddBoolToObject(resp, "ok", false);
+        cJSON_AddStringToObject(resp, "error", "unknown_binary_op");
+    }
+    return resp;
+}
+
 static esp_err_t ws_handler(httpd_req_t *req) {
     if (req->method == HTTP_GET) {
         ESP_LOGI(TAG, "WS handshake OK");
@@ -132,6 +185,15 @@ static esp_err_t ws_handler(httpd_req_t *req) {
     }
     buf[frame.len] = 0;
 
+    // JSON sent as bytes (e.g. orjson) arrives as a binary frame; only non-'{' payloads are binary ops.
+    if (frame.type == HTTPD_WS_TYPE_BINARY && buf[0] != '{') {
+        cJSON *resp = handle_binary((const uint8_t *)buf, frame.len);
+        free(buf);
+        esp_err_t se = send_json(req, resp);
+        cJSON_Delete(resp);
+        return se;
+    }
+
     cJSON *root = cJSON_Parse(buf);
     free(buf);
 
@@ -0,0 +1,53 @@
+"""RMS of PCM16 mono chunks for the mouth-driving path.
+
+`rms_i16` uses a Numba-compiled loop when numba is installed, else plain NumPy
+int64 squares. `mouth_open` turns each chunk's RMS into the smoothed mouth
+openness the WS scripts send.
+
+numpy-rms isn't used: it only vectorizes float32, and with the int16 -> float32
+copy it was no faster than the NumPy path (and ~14x slower than Numba).
+"""
+
+import os
+
+import numpy as np
+
+# Keep compiled kernels across runs so only the first one pays the JIT cost.
+# Must be set before numba is imported.
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.expanduser("~/.openclaw/state/numba_cache"))
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+
+    # No explicit signature: np.frombuffer() views are read-only, which Numba
+    # types differently from i2[::1], so let it specialize on first call.
+    @njit(cache=True, fastmath=True)
+    def _rms_i16_jit(x):
+        acc = np.int64(0)
+        for i in range(x.shape[0]):
+            acc += np.int64(x[i]) * np.int64(x[i])
+        return np.float32((acc / x.shape[0]) ** 0.5)
+
+    def rms_i16(x: np.ndarray) -> float:
+        return float(_rms_i16_jit(x))
+
+else:
+
+    def rms_i16(x: np.ndarray) -> float:
+        # Square into int64 (no float32 temporary); 800 * 32768**2 fits easily.
+        return float(np.sqrt(np.mean(np.square(x, dtype=np.int64))))
+
+
+def mouth_open(frames: bytes, prev: float) -> float:
+    """Return a smoothed mouth_open value 0..1 based on the RMS of a PCM16 LE chunk."""
+    x = np.frombuffer(frames, dtype="<i2")  # zero-copy view; PCM16 is little-endian
+    if x.size == 0:
+        return prev
+    # Map RMS -> openness (tune this empirically), then smooth.
+    target = min(1.0, max(0.0, rms_i16(x) / 7000.0))
+    return prev * 0.70 + target * 0.30
@@ -0,0 +1,226 @@
+"""Shared helpers for streaming `say` audio to littleAI over WebSocket.
+
+Binary frame layout, prebuilt commands, macOS `say` streaming, and the pipelined
+ack window used by speak_ws.py / attention.py / boot_greet.py.
+"""
+
+import asyncio
+import os
+import struct
+import subprocess
+
+from dsp import mouth_open
+
+try:
+    import orjson
+
+    def jdumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    def jdumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 800  # 50ms @ 16kHz
+
+# Binary frame header: <u8 op><u8 reserved><u16 LE arg>, then raw PCM16 LE.
+PCM_HDR = b"\x01\x00\x00\x00"  # speak_pcm
+OP_PCM_MOUTH = 0x02  # speak_pcm + mouth open, arg = 0..1000
+OP_MOUTH = 0x03  # mouth open only, arg = 0..1000 (no payload)
+MOUTH_EPS = 0.02  # skip mouth updates smaller than this; the face can't show them
+
+
+def aio_run(main):
+    """asyncio.run(main), on uvloop when it's installed.
+
+    Called from each script's main() so importing a script doesn't swap the
+    global event loop policy.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
+    return uvloop.run(main)
+
+
+def mouth_frame(v: float) -> bytes:
+    """Binary equivalent of {"type":"mouth","open":v}."""
+    return struct.pack("<BxH", OP_MOUTH, round(v * 1000))
+
+
+def pcm_mouth_frame(v: float) -> bytes:
+    """Header for a speak_pcm frame that also sets mouth openness to `v`."""
+    return struct.pack("<BxH", OP_PCM_MOUTH, round(v * 1000))
+
+
+# Static commands, encoded once.
+MOUTH_ZERO = mouth_frame(0.0)
+RIG_CLEAR = jdumps({"type": "rig_clear"})
+
+
+_SANITIZE = str.maketrans({
+    "’": "'",
+    "‘": "'",
+    "“": '"',
+    "”": '"',
+    "…": "...",
+    "—": "-",
+    "–": "-",
+    "\u00A0": " ",
+})
+
+
+def sanitize_text(s: str) -> str:
+    # LVGL's default Montserrat font set often doesn't include smart quotes, ellipsis, em-dash, etc.
+    # Replace with ASCII so captions don't show as missing-glyph squares.
+    return s.translate(_SANITIZE)
+
+
+def check_fmt(body: bytes) -> None:
+    """Assert a WAV `fmt ` chunk body describes PCM16 mono at SAMPLE_RATE."""
+    _, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+    assert channels == 1, channels
+    assert bits == 16, bits
+    assert rate == SAMPLE_RATE, rate
+
+
+async def read_wav_header(stdout: asyncio.StreamReader) -> None:
+    """Validate a streamed WAV header and consume it up to the start of the PCM data."""
+    riff, _, wave_id = struct.unpack("<4sI4s", await stdout.readexactly(12))
+    assert riff == b"RIFF" and wave_id == b"WAVE", (riff, wave_id)
+    while True:
+        chunk_id, size = struct.unpack("<4sI", await stdout.readexactly(8))
+        if chunk_id == b"data":
+            # Size is unknown/bogus when writing to a pipe; just read until EOF.
+            return
+        # CoreAudio may add padding chunks (e.g. FLLR) before `data`.
+        body = await stdout.readexactly(size + (size & 1))
+        if chunk_id == b"fmt ":
+            check_fmt(body)
+
+
+async def say_chunks(text: str):
+    """Yield PCM16 chunks from macOS `say` as they are synthesized (no temp file)."""
+    # Give `say` a real pipe: uvloop's stdout=PIPE is a socketpair, which
+    # `-o /dev/stdout` can't open.
+    r, w = os.pipe()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "say", "-o", "/dev/stdout", "--file-format=WAVE", "--data-format=LEI16@16000", sanitize_text(text),
+            stdout=w,
+        )
+    except BaseException:
+        os.close(r)
+        raise
+    finally:
+        os.close(w)
+    stdout = asyncio.StreamReader()
+    transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(stdout), os.fdopen(r, "rb", 0)
+    )
+    try:
+        try:
+            await read_wav_header(stdout)
+        except asyncio.IncompleteReadError:
+            # `say` died before writing audio (bad voice, no audio device, ...):
+            # report its exit status rather than the short read.
+            if await proc.wait() != 0:
+                raise subprocess.CalledProcessError(proc.returncode, "say") from None
+            raise
+        while True:
+            try:
+                frames = await stdout.readexactly(CHUNK_SAMPLES * 2)
+            except asyncio.IncompleteReadError as e:
+                frames = e.partial[: len(e.partial) & ~1]  # whole samples only
+            if not frames:
+                break
+            yield frames
+        if await proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, "say")
+    finally:
+        transport.close()
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+async def pcm_frames(chunks, drive_face: bool = True):
+    """Turn PCM16 chunks into binary speak_pcm frames.
+
+    With `drive_face`, each frame's header also carries the mouth openness from
+    the chunk's RMS, unless it moved less than MOUTH_EPS since the last one sent.
+    """
+    mouth_prev = 0.0
+    mouth_sent = 0.0
+    async for frames in chunks:
+        hdr = PCM_HDR
+        if drive_face:
+            mouth_prev = mouth_open(frames, mouth_prev)
+            if abs(mouth_prev - mouth_sent) >= MOUTH_EPS:
+                mouth_sent = mouth_prev
+                hdr = pcm_mouth_frame(mouth_prev)
+        yield hdr + frames
+
+
+async def ws_send(ws, obj):
+    """Send a dict (or a pre-encoded message) and wait for the ack."""
+    await ws.send(obj if isinstance(obj, (bytes, str)) else jdumps(obj))
+    return await ws.recv()
+
+
+class AckWindow:
+    """Keep up to `depth` commands in flight instead of waiting a round-trip per send.
+
+    A background task drains the device acks (printing failures) and frees one slot
+    per reply. Leaving the block waits for every outstanding ack, so the socket can
+    go back to plain send/recv afterwards. On errors that wait is capped at
+    `error_timeout_s`; if it runs out, the socket is out of step and should be dropped.
+    """
+
+    def __init__(self, ws, depth: int = 8, error_timeout_s: float = 5.0):
+        self.ws = ws
+        self.depth = depth
+        self.error_timeout_s = error_timeout_s
+        self._slots = asyncio.Semaphore(depth)
+        self._reader = None
+
+    async def __aenter__(self):
+        self._reader = asyncio.create_task(self._drain())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            # Collect the acks still in flight even when unwinding, so the next
+            # send/recv pair doesn't read a stale reply.
+            await asyncio.wait_for(self._reclaim(), None if exc_type is None else self.error_timeout_s)
+        except asyncio.TimeoutError:
+            if exc_type is None:
+                raise
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+
+    async def _drain(self):
+        try:
+            while True:
+                rep = await self.ws.recv()
+                if '"ok":true' not in rep:
+                    print(rep)
+                self._slots.release()
+        finally:
+            # Don't leave senders parked if the socket goes away.
+            for _ in range(self.depth):
+                self._slots.release()
+
+    async def _reclaim(self):
+        for _ in range(self.depth):
+            await self._slots.acquire()
+
+    async def send(self, msg) -> None:
+        await self._slots.acquire()
+        await self.ws.send(msg)